@@ -1,22 +1,42 @@
+import sys
 from pathlib import Path
 
 from unasync import unasync_files, Rule
 
+ASYNC_DIR = "/_async/"
+SYNC_DIR = "/_sync/"
+
 directories = [
     Path("httpx_caching"),
     Path("tests"),
 ]
+
+# Only regenerate sync files whose async source (or this script's rules) changed
+# since they were last generated, unless --force is given.
+force = "--force" in sys.argv[1:]
+script_mtime = Path(__file__).stat().st_mtime
+
+
+def is_stale(source: Path) -> bool:
+    target = Path(str(source).replace(ASYNC_DIR, SYNC_DIR))
+    if force or not target.exists():
+        return True
+    target_mtime = target.stat().st_mtime
+    return target_mtime < source.stat().st_mtime or target_mtime < script_mtime
+
+
 file_paths = set()
 for directory in directories:
     for p in directory.rglob("*.py"):
-        file_paths.add(str(p))
+        if ASYNC_DIR in p.as_posix() and is_stale(p):
+            file_paths.add(str(p))
 
 unasync_files(
     file_paths,
     rules=[
         Rule(
-            fromdir="/_async/",
-            todir="/_sync/",
+            fromdir=ASYNC_DIR,
+            todir=SYNC_DIR,
             additional_replacements={
                 "AsyncBaseTransport": "BaseTransport",
                 "AsyncHTTPTransport": "HTTPTransport",
@@ -38,4 +58,3 @@ unasync_files(
         ),
     ],
 )
-
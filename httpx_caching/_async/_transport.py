@@ -1,20 +1,26 @@
 import logging
-from typing import Iterable, Optional, Tuple
+import weakref
+from typing import Callable, Dict, Iterable, Optional, Tuple
 
 import httpx
-from multimethod import multimethod
 
 from httpx_caching import AsyncDictCache, _policy as protocol
 from httpx_caching._heuristics import BaseHeuristic
 from httpx_caching._models import Response
-from httpx_caching._policy import CachingPolicy, Source
-from httpx_caching._utils import ByteStreamWrapper
+from httpx_caching._policy import (
+    INVALIDATING_METHODS,
+    CachingPolicy,
+    Source,
+    get_cache_key,
+)
+from httpx_caching._serializer import CachedByteStream
+from httpx_caching._utils import AsyncEvent, ByteStreamWrapper, SyncLock
 
 logger = logging.getLogger(__name__)
 
 
 class AsyncCachingTransport(httpx.AsyncBaseTransport):
-    invalidating_methods = {"PUT", "PATCH", "DELETE"}
+    invalidating_methods = INVALIDATING_METHODS
 
     def __init__(
         self,
@@ -30,55 +36,119 @@ class AsyncCachingTransport(httpx.AsyncBaseTransport):
             301,
             308,
         ),
+        max_body_size: Optional[int] = None,
+        coalesce_timeout: Optional[float] = None,
+        max_entries: Optional[int] = 10_000,
     ):
         self.transport = transport
 
-        self.cache = AsyncDictCache() if cache is None else cache
+        # max_entries bounds the default cache, pass None for no limit.
+        self.cache = AsyncDictCache(max_entries=max_entries) if cache is None else cache
         self.heuristic = heuristic
-        self.cacheable_methods = cacheable_methods
-        self.cacheable_status_codes = cacheable_status_codes
+        self.cacheable_methods = frozenset(cacheable_methods)
+        self.cacheable_status_codes = frozenset(cacheable_status_codes)
         self.cache_etags = cache_etags
+        self.max_body_size = max_body_size
+        # When set, concurrent requests for a URL that is already being fetched
+        # wait (up to this many seconds) for that fetch to populate the cache.
+        self.coalesce_timeout = coalesce_timeout
+        self._inflight: Dict[str, AsyncEvent] = {}
+        self._inflight_lock = SyncLock()
+        self._handlers: Dict[type, Callable] = {
+            protocol.CacheGet: self._io_cache_get,
+            protocol.CacheDelete: self._io_cache_delete,
+            protocol.CacheSet: self._io_cache_set,
+            protocol.MakeRequest: self._io_make_request,
+            protocol.CloseResponseStream: self._io_close_response_stream,
+        }
 
     async def handle_async_request(
         self,
         request: httpx.Request,
     ) -> httpx.Response:
+        cache_key = None
+        inflight = None
+        if (
+            self.coalesce_timeout is not None
+            and request.method in self.cacheable_methods
+        ):
+            cache_key = get_cache_key(request)
+            inflight = await self._join_inflight(cache_key)
+
+        try:
+            response = await self._run_policy(request, cache_key)
+        except BaseException:
+            if inflight:
+                self._leave_inflight(*inflight)
+            raise
+
+        if inflight:
+            if isinstance(response.stream, ByteStreamWrapper):
+                # The cache is only written once the body has been read. A
+                # response that is dropped unread and unclosed releases the
+                # entry when it's garbage collected.
+                response.stream.on_finish = weakref.finalize(
+                    response.stream, self._leave_inflight, *inflight
+                )
+            else:
+                self._leave_inflight(*inflight)
+
+        return response.to_httpx()
+
+    async def _join_inflight(self, key: str) -> Optional[Tuple[str, AsyncEvent]]:
+        """
+        Wait for any in-flight request for `key` to finish, otherwise register
+        this request as the one in flight.
+        """
+        with self._inflight_lock:
+            event = self._inflight.get(key)
+            if event is None:
+                event = self._inflight[key] = AsyncEvent()
+                return key, event
+
+        logger.debug(f'Waiting for in-flight request for "{key}"')
+        await event.wait(self.coalesce_timeout)
+        return None
+
+    def _leave_inflight(self, key: str, event: AsyncEvent) -> None:
+        with self._inflight_lock:
+            if self._inflight.get(key) is event:
+                del self._inflight[key]
+        event.set()
 
+    async def _run_policy(
+        self, request: httpx.Request, cache_key: Optional[str]
+    ) -> Response:
         caching_protocol = CachingPolicy(
             request=request,
             cache_etags=self.cache_etags,
             heuristic=self.heuristic,
             cacheable_methods=self.cacheable_methods,
             cacheable_status_codes=self.cacheable_status_codes,
+            max_body_size=self.max_body_size,
+            cache_key=cache_key,
         )
 
         response, source = await caching_protocol.arun(self.aio_handler)
 
         response.extensions["from_cache"] = source == Source.CACHE
-        real_response = httpx.Response(
-            status_code=response.status_code,
-            headers=response.headers,
-            stream=response.stream,
-            extensions=response.extensions,
-        )
-        return real_response
+        return response
 
-    @multimethod
     async def aio_handler(self, action):
-        raise NotImplementedError(f"Cannot handle {action}")
+        handler = self._handlers.get(type(action))
+        if handler is None:
+            raise NotImplementedError(f"Cannot handle {action}")
+        return await handler(action)
 
-    @aio_handler.register
     async def _io_cache_get(
         self, action: protocol.CacheGet
     ) -> Tuple[Optional[Response], Optional[dict]]:
         return await self.cache.aget(action.key)
 
-    @aio_handler.register
     async def _io_cache_delete(self, action: protocol.CacheDelete) -> None:
         await self.cache.adelete(action.key)
         return None
 
-    @aio_handler.register
     async def _io_cache_set(self, action: protocol.CacheSet) -> Optional[Response]:
         if action.deferred:
             # This is a response with a body, so we need to wait for it to be read before we can cache it
@@ -87,16 +157,28 @@ class AsyncCachingTransport(httpx.AsyncBaseTransport):
             )
         else:
             stream = action.response.stream
-            # TODO: Are we needlessly recaching the body here? Is this just a header change?
+            body_encoding = None
+            if isinstance(stream, CachedByteStream):
+                # A 304 refresh only changes the headers, so store the body
+                # as it was cached, without decoding and re-encoding it.
+                body, body_encoding = stream._stream, stream.encoding
+            else:
+                # In memory bodies (e.g. a cached redirect's empty body) can be
+                # stored without iterating.
+                in_memory = getattr(stream, "_stream", None)
+                if isinstance(in_memory, bytes):
+                    body = in_memory
+                else:
+                    body = b"".join(stream)  # type: ignore
             await self.cache.aset(
                 action.key,
                 action.response,
                 action.vary_header_values,
-                b"".join(stream),  # type: ignore
+                body,
+                body_encoding,
             )
         return None
 
-    @aio_handler.register
     async def _io_make_request(self, action: protocol.MakeRequest) -> Response:
         response = await self.transport.handle_async_request(action.request)  # type: ignore
         return Response(
@@ -106,7 +188,6 @@ class AsyncCachingTransport(httpx.AsyncBaseTransport):
             extensions=response.extensions,  # type: ignore
         )
 
-    @aio_handler.register
     async def _io_close_response_stream(
         self, action: protocol.CloseResponseStream
     ) -> None:
@@ -117,12 +198,33 @@ class AsyncCachingTransport(httpx.AsyncBaseTransport):
         self, key: str, response: Response, vary_header_values: dict
     ) -> Response:
         response_stream: httpx.AsyncByteStream = response.stream  # type: ignore
-        wrapped_stream = ByteStreamWrapper(response_stream)
+        wrapped_stream = ByteStreamWrapper(response_stream, max_size=self.max_body_size)
         response.stream = wrapped_stream
 
-        async def callback(response_body: bytes):
-            logger.debug("saving to cache:", key)
-            await self.cache.aset(key, response, vary_header_values, response_body)
+        # The caller gets `response` itself (sharing its headers, see
+        # Response.to_httpx) and may change them before reading the body, so
+        # store a snapshot of the headers as they were received.
+        cached_response = Response(
+            status_code=response.status_code,
+            headers=response.headers.copy(),
+            stream=wrapped_stream,
+            extensions=response.extensions,
+        )
+        cache_set = self.cache.aset
+
+        async def callback(response_body: bytes) -> None:
+            # Don't cache a body that was cut short. Comparing strings avoids
+            # parsing the header.
+            expected_length = response.headers.get("content-length")
+            if (
+                expected_length
+                and expected_length.isdigit()
+                and expected_length != str(len(response_body))
+            ):
+                logger.debug('Body of "%s" is incomplete, not caching', key)
+                return
+            logger.debug('Saving "%s" to the cache', key)
+            await cache_set(key, cached_response, vary_header_values, response_body)
 
         response.stream.callback = callback
         return response
@@ -5,10 +5,17 @@
 import calendar
 import time
 from datetime import datetime, timedelta
-from email.utils import formatdate, parsedate, parsedate_tz
+from email.utils import formatdate
+
+from ._utils import http_date_to_epoch
 
 TIME_FMT = "%a, %d %b %Y %H:%M:%S GMT"
 
+# https://tools.ietf.org/html/rfc7231#section-6.1
+CACHEABLE_BY_DEFAULT_STATUSES = frozenset(
+    {200, 203, 204, 206, 300, 301, 404, 405, 410, 414, 501}
+)
+
 
 def expire_after(delta, date=None):
     date = date or datetime.utcnow()
@@ -16,7 +23,7 @@ def expire_after(delta, date=None):
 
 
 def datetime_to_header(dt):
-    return formatdate(calendar.timegm(dt.timetuple()))
+    return formatdate(calendar.timegm(dt.timetuple()), usegmt=True)
 
 
 class BaseHeuristic(object):
@@ -60,10 +67,11 @@ class OneDayCacheHeuristic(BaseHeuristic):
         headers = {}
 
         if "expires" not in response_headers:
-            date = parsedate(response_headers["date"])
-            expires = expire_after(timedelta(days=1), date=datetime(*date[:6]))
-            headers["expires"] = datetime_to_header(expires)
-            headers["cache-control"] = "public"
+            date = http_date_to_epoch(response_headers.get("date"))
+            if date is not None:
+                expires = date + timedelta(days=1).total_seconds()
+                headers["expires"] = formatdate(expires, usegmt=True)
+                headers["cache-control"] = "public"
         return headers
 
 
@@ -97,50 +105,33 @@ class LastModifiedHeuristic(BaseHeuristic):
     Unlike mozilla we limit this to 24-hr.
     """
 
-    cacheable_by_default_statuses = {
-        200,
-        203,
-        204,
-        206,
-        300,
-        301,
-        404,
-        405,
-        410,
-        414,
-        501,
-    }
+    cacheable_by_default_statuses = CACHEABLE_BY_DEFAULT_STATUSES
 
     def update_headers(self, response_headers, response_status):
         if "expires" in response_headers:
             return {}
 
-        if (
-            "cache-control" in response_headers
-            and response_headers["cache-control"] != "public"
-        ):
+        cache_control = response_headers.get("cache-control")
+        if cache_control is not None and cache_control != "public":
             return {}
 
         if response_status not in self.cacheable_by_default_statuses:
             return {}
 
-        if "date" not in response_headers or "last-modified" not in response_headers:
-            return {}
-
-        date = calendar.timegm(parsedate_tz(response_headers["date"]))
-        last_modified = parsedate(response_headers["last-modified"])
+        date = http_date_to_epoch(response_headers.get("date"))
+        last_modified = http_date_to_epoch(response_headers.get("last-modified"))
         if date is None or last_modified is None:
             return {}
 
         now = time.time()
         current_age = max(0, now - date)
-        delta = date - calendar.timegm(last_modified)
+        delta = date - last_modified
         freshness_lifetime = max(0, min(delta / 10, 24 * 3600))
         if freshness_lifetime <= current_age:
             return {}
 
         expires = date + freshness_lifetime
-        return {"expires": time.strftime(TIME_FMT, time.gmtime(expires))}
+        return {"expires": formatdate(expires, usegmt=True)}
 
     def warning(self):
         return None
@@ -1,12 +1,17 @@
 import dataclasses
-from typing import Union
+import sys
+from typing import Optional, Union
 
+import httpx
 from httpx import ByteStream, Headers
 
 from ._utils import ByteStreamWrapper
 
+# Slotted dataclasses (3.10+) drop the per-instance __dict__.
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
-@dataclasses.dataclass
+
+@dataclasses.dataclass(**_DATACLASS_OPTIONS)
 class Response:
     """
     Simple wrapper for the raw response returned by a transport.
@@ -16,3 +21,20 @@ class Response:
     headers: Headers
     stream: Union[ByteStream, ByteStreamWrapper]
     extensions: dict = dataclasses.field(default_factory=dict)
+    # The Date and Expires headers as epoch seconds, if they were parsed ahead
+    # of time (i.e. when the response was cached).
+    date_epoch: Optional[int] = None
+    expires_epoch: Optional[int] = None
+
+    def to_httpx(self) -> httpx.Response:
+        """
+        Hand the response over to httpx, sharing the headers rather than
+        copying them as `httpx.Response(headers=...)` would.
+        """
+        response = httpx.Response(
+            status_code=self.status_code,
+            stream=self.stream,  # type: ignore
+            extensions=self.extensions,
+        )
+        response.headers = self.headers
+        return response
@@ -1,27 +1,67 @@
-import calendar
+import functools
 import logging
+import re
 import time
 import typing
-from copy import copy
 from dataclasses import dataclass
-from email.utils import parsedate_tz
 from enum import Enum
-from typing import Awaitable, Callable, Generator, Iterable, Optional, Tuple, Union
+from types import MappingProxyType
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    FrozenSet,
+    Generator,
+    Iterable,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
 
-from httpx import ByteStream, Headers, Request, codes
+from httpx import ByteStream, Headers, Request
 
 from ._heuristics import BaseHeuristic
 from ._models import Response
-from ._utils import async_callback_generator, sync_callback_generator
+from ._utils import (
+    async_callback_generator,
+    http_date_to_epoch,
+    sync_callback_generator,
+)
 
 logger = logging.getLogger(__name__)
 
-PERMANENT_REDIRECT_STATUSES = (
-    301,
-    308,
+PERMANENT_REDIRECT_STATUSES = frozenset({301, 308})
+
+INVALIDATING_METHODS = frozenset({"PUT", "PATCH", "DELETE"})
+
+# Headers from a 304 that must not overwrite those of the cached response.
+NOT_MODIFIED_EXCLUDED_HEADERS = frozenset({"content-length"})
+
+# Cached response headers and the request headers used to revalidate them.
+CONDITIONAL_REQUEST_HEADERS = (
+    ("etag", "If-None-Match"),
+    ("last-modified", "If-Modified-Since"),
 )
 
-INVALIDATING_METHODS = ("PUT", "PATCH", "DELETE")
+KNOWN_CACHE_CONTROL_DIRECTIVES = {
+    # https://tools.ietf.org/html/rfc7234#section-5.2
+    "max-age": (int, True),
+    "max-stale": (int, False),
+    "min-fresh": (int, True),
+    "no-cache": (None, False),
+    "no-store": (None, False),
+    "no-transform": (None, False),
+    "only-if-cached": (None, False),
+    "must-revalidate": (None, False),
+    "public": (None, False),
+    "private": (None, False),
+    "proxy-revalidate": (None, False),
+    "s-maxage": (int, True),
+}
+
+# One comma separated `directive[=value]`, with surrounding whitespace dropped.
+CACHE_CONTROL_DIRECTIVE_RE = re.compile(r"([^,=\s]+)\s*(?:=\s*([^,]*?))?\s*(?:,|$)")
 
 Source = Enum("Source", ["CACHE", "SERVER"])
 Evaluation = Enum("Evaluation", ["GOOD", "INCONCLUSIVE"])
@@ -77,8 +117,11 @@ class CachingPolicy:
     request: Request
     cache_etags: bool
     heuristic: Optional[BaseHeuristic]
-    cacheable_methods: Iterable[str]
-    cacheable_status_codes: Iterable[int]
+    cacheable_methods: FrozenSet[str]
+    cacheable_status_codes: FrozenSet[int]
+    max_body_size: Optional[int] = None
+    # Callers that already know the request's cache key can pass it in.
+    cache_key: Optional[str] = None
 
     @typing.no_type_check
     def run(
@@ -95,6 +138,8 @@ class CachingPolicy:
                 heuristic=self.heuristic,
                 cacheable_methods=self.cacheable_methods,
                 cacheable_status_codes=self.cacheable_status_codes,
+                max_body_size=self.max_body_size,
+                cache_key=self.cache_key,
             ),
         )
 
@@ -112,6 +157,8 @@ class CachingPolicy:
                 heuristic=self.heuristic,
                 cacheable_methods=self.cacheable_methods,
                 cacheable_status_codes=self.cacheable_status_codes,
+                max_body_size=self.max_body_size,
+                cache_key=self.cache_key,
             ),
         )
 
@@ -119,12 +166,24 @@ class CachingPolicy:
 def caching_policy(
     request: Request,
     cache_etags: bool,
-    heuristic: BaseHeuristic,
-    cacheable_methods: Tuple[str],
-    cacheable_status_codes: Tuple[int],
+    heuristic: Optional[BaseHeuristic],
+    cacheable_methods: FrozenSet[str],
+    cacheable_status_codes: FrozenSet[int],
+    max_body_size: Optional[int] = None,
+    cache_key: Optional[str] = None,
 ) -> Generator[IOAction, Response, Tuple[Response, Source]]:
+    if (
+        request.method not in cacheable_methods
+        and request.method not in INVALIDATING_METHODS
+    ):
+        # Nothing to look up, store or invalidate, so skip building a cache key.
+        response = yield MakeRequest(request)
+        return response, Source.SERVER
+
+    if cache_key is None:
+        cache_key = get_cache_key(request)
     cached_response, evaluation = yield from try_from_cache_policy(
-        request, cacheable_methods
+        request, cache_key, cacheable_methods
     )
     logger.debug(f"evaluation: {evaluation}")
     if cached_response and evaluation == Evaluation.GOOD:
@@ -132,17 +191,20 @@ def caching_policy(
 
     response, source = yield from try_from_server_policy(
         request,
+        cache_key,
         cached_response,
         heuristic,
         cache_etags,
         cacheable_status_codes,
         cacheable_methods,
+        max_body_size,
     )
     return response, source
 
 
 def try_from_cache_policy(
     request: Request,
+    cache_key: str,
     cacheable_methods: Iterable[str],
 ) -> Generator[
     CacheAction,
@@ -155,8 +217,6 @@ def try_from_cache_policy(
     may finally return valid response as StopIteration value
     """
     # Will only yield GET or DELETE CacheActions. Does not write to cache.
-    cache_key = get_cache_key(request)
-
     if request.method not in cacheable_methods:
         return None, None
 
@@ -200,7 +260,11 @@ def try_from_cache_policy(
         logger.debug(msg)
         return cached_response, Evaluation.GOOD
 
-    if "date" not in cached_response.headers:
+    date = cached_response.date_epoch
+    if date is None:
+        # A Date header that can't be parsed is treated as missing.
+        date = http_date_to_epoch(cached_response.headers.get("date"))
+    if date is None:
         if "etag" not in cached_response.headers:
             # Without date or etag, the cached response can never be used
             # and should be deleted.
@@ -212,8 +276,6 @@ def try_from_cache_policy(
         return cached_response, Evaluation.INCONCLUSIVE
 
     now = time.time()
-    # TODO: parsedate_tz might return None (no date value or malformed)
-    date = calendar.timegm(parsedate_tz(cached_response.headers["date"]))  # type: ignore
     current_age = max(0, now - date)
     logger.debug("Current age based on date: %i", current_age)
 
@@ -227,10 +289,12 @@ def try_from_cache_policy(
         freshness_lifetime = resp_cc["max-age"]
         logger.debug("Freshness lifetime from max-age: %i", freshness_lifetime)
     # If there isn't a max-age, check for an expires header
-    elif "expires" in cached_response.headers:
-        expires = parsedate_tz(cached_response.headers["expires"])
+    else:
+        expires = cached_response.expires_epoch
+        if expires is None:
+            expires = http_date_to_epoch(cached_response.headers.get("expires"))
         if expires is not None:
-            expire_time = calendar.timegm(expires) - date  # type: ignore
+            expire_time = expires - date
             freshness_lifetime = max(0, expire_time)
             logger.debug("Freshness lifetime from expires: %i", freshness_lifetime)
 
@@ -264,35 +328,41 @@ def try_from_cache_policy(
 
 def try_from_server_policy(
     request: Request,
+    cache_key: str,
     cached_response: Optional[Response],
-    heuristic: BaseHeuristic,
+    heuristic: Optional[BaseHeuristic],
     cache_etags: bool,
     cacheable_status_codes: Iterable[int],
     cacheable_methods: Iterable[str],
+    max_body_size: Optional[int] = None,
 ) -> Generator[IOAction, Response, Tuple[Response, Source]]:
-    cache_key = get_cache_key(request)
-    logger.debug("we have this from the cache:", cached_response)
-    updated_headers = request.headers.copy()
+    logger.debug("we have this from the cache: %s", cached_response)
+    conditional_headers = {}
     if cached_response:
         # Add conditional headers based on cached response
-        for source, target in [
-            ("etag", "If-None-Match"),
-            ("last-modified", "If-Modified-Since"),
-        ]:
-            if source in cached_response.headers:
-                updated_headers[target] = cached_response.headers[source]
-
-    request = Request(
-        method=request.method,
-        url=request.url,
-        headers=updated_headers,
-        stream=request.stream,
-    )
+        for source, target in CONDITIONAL_REQUEST_HEADERS:
+            value = cached_response.headers.get(source)
+            if value is not None:
+                conditional_headers[target] = value
+
+    # Only copy the request when there is something to add to it. The
+    # caller's request is left untouched, as it may be sent again.
+    if conditional_headers:
+        updated_headers = request.headers.copy()
+        updated_headers.update(conditional_headers)
+        request = Request(
+            method=request.method,
+            url=request.url,
+            headers=updated_headers,
+            stream=request.stream,
+            extensions=request.extensions,
+        )
     server_response = yield MakeRequest(request)
 
-    # See if we should invalidate the cache.
-    if is_invalidating_method(request.method) and not codes.is_error(
-        server_response.status_code
+    # See if we should invalidate the cache. The method check comes first so
+    # that the usual GET bails out on a single set lookup.
+    if request.method in INVALIDATING_METHODS and not (
+        400 <= server_response.status_code < 600
     ):
         yield CacheDelete(cache_key)
 
@@ -331,10 +401,12 @@ def try_from_server_policy(
     cache_exists = bool(cached_response)
     cache_action = cache_response_action(
         request,
+        cache_key,
         server_response,
         cache_exists,
         cache_etags,
         cacheable_status_codes,
+        max_body_size,
     )
     if cache_action:
         wrapped_stream_response = yield cache_action
@@ -346,10 +418,12 @@ def try_from_server_policy(
 
 def cache_response_action(
     request: Request,
+    cache_key: str,
     server_response: Response,
     cache_exists: bool,
     cache_etags: bool,
     cacheable_status_codes: Iterable[int],
+    max_body_size: Optional[int] = None,
 ) -> Optional[Union[CacheSet, CacheDelete]]:
     """
     Algorithm for caching responses.
@@ -364,7 +438,6 @@ def cache_response_action(
     Returns:
     May return a request that has had its stream wrapped to trigger caching once read.
     """
-    cache_key = get_cache_key(request)
 
     # From httplib2: Don't cache 206's since we aren't going to
     #                handle byte range requests
@@ -405,13 +478,20 @@ def cache_response_action(
         logger.debug('Response header has "Vary: *"')
         return None
 
+    # Don't buffer a body we already know is too big to keep.
+    if max_body_size is not None:
+        content_length = server_response.headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > max_body_size:
+            logger.debug("Content-Length exceeds %i bytes, not caching", max_body_size)
+            return None
+
     # If we've been given an etag, then keep the response
     if cache_etags and "etag" in server_response.headers:
         logger.debug("Caching due to etag")
 
     # Add to the cache any permanent redirects. We do this before looking
     # that the Date headers.
-    elif int(server_response.status_code) in PERMANENT_REDIRECT_STATUSES:
+    elif server_response.status_code in PERMANENT_REDIRECT_STATUSES:
         logger.debug("Caching permanent redirect")
         response_body = b""
         response = Response(
@@ -433,11 +513,12 @@ def cache_response_action(
 
         # If the request can expire, it means we should cache it
         # in the meantime.
-        elif "expires" in server_response.headers:
-            if server_response.headers["expires"]:
-                logger.debug("Caching b/c of expires header")
         else:
-            return None
+            expires = server_response.headers.get("expires")
+            if expires is None:
+                return None
+            if expires:
+                logger.debug("Caching b/c of expires header")
     else:
         return None
 
@@ -453,36 +534,30 @@ def is_invalidating_method(method: str):
     return method in INVALIDATING_METHODS
 
 
-def parse_cache_control_directives(headers: Headers):
-    known_directives = {
-        # https://tools.ietf.org/html/rfc7234#section-5.2
-        "max-age": (int, True),
-        "max-stale": (int, False),
-        "min-fresh": (int, True),
-        "no-cache": (None, False),
-        "no-store": (None, False),
-        "no-transform": (None, False),
-        "only-if-cached": (None, False),
-        "must-revalidate": (None, False),
-        "public": (None, False),
-        "private": (None, False),
-        "proxy-revalidate": (None, False),
-        "s-maxage": (int, True),
-    }
-
-    cc_headers = headers.get("cache-control", "")
+def parse_cache_control_directives(headers: Headers) -> Mapping[str, Any]:
+    return _parse_cache_control(headers.get("cache-control", ""))
 
+
+@functools.lru_cache(maxsize=256)
+def _parse_cache_control(cc_headers: str) -> Mapping[str, Any]:
+    """
+    Parse a cache-control header value into its known directives.
+
+    Requests and responses tend to repeat the same few header values, so the
+    parsed (read only) result is memoized on the raw value.
+    """
     retval = {}  # type: ignore
 
-    for cc_directive in cc_headers.split(","):
-        if not cc_directive.strip():
-            continue
+    # Most requests (and plenty of responses) don't carry the header at all.
+    if not cc_headers:
+        return MappingProxyType(retval)
 
-        parts = cc_directive.split("=", 1)
-        directive = parts[0].strip()
+    for match in CACHE_CONTROL_DIRECTIVE_RE.finditer(cc_headers):
+        directive, value = match.groups()
+        directive = directive.lower()
 
         try:
-            typ, required = known_directives[directive]
+            typ, required = KNOWN_CACHE_CONTROL_DIRECTIVES[directive]
         except KeyError:
             logger.debug("Ignoring unknown cache-control directive: %s", directive)
             continue
@@ -490,14 +565,15 @@ def parse_cache_control_directives(headers: Headers):
         if not typ or not required:
             retval[directive] = None
         if typ:
-            try:
-                retval[directive] = typ(parts[1].strip())
-            except IndexError:
+            if value is None:
                 if required:
                     logger.debug(
                         "Missing value for cache-control " "directive: %s",
                         directive,
                     )
+                continue
+            try:
+                retval[directive] = typ(value)
             except ValueError:
                 logger.debug(
                     "Invalid value for cache-control directive " "%s, must be %s",
@@ -505,7 +581,7 @@ def parse_cache_control_directives(headers: Headers):
                     typ.__name__,
                 )
 
-    return retval
+    return MappingProxyType(retval)
 
 
 def update_with_304_response(
@@ -517,7 +593,12 @@ def update_with_304_response(
     This should only ever be called when we've sent an ETag and
     gotten a 304 as the response.
     """
-    updated_response = copy(cached_response)
+    updated_response = Response(
+        status_code=cached_response.status_code,
+        headers=cached_response.headers,
+        stream=cached_response.stream,
+        extensions=cached_response.extensions,
+    )
 
     # Lets update our headers with the headers from the new request:
     # http://tools.ietf.org/html/draft-ietf-httpbis-p4-conditional-26#section-4.1
@@ -526,15 +607,13 @@ def update_with_304_response(
     # the cached body invalid. But... just in case, we'll be sure
     # to strip out ones we know that might be problematic due to
     # typical assumptions.
-    excluded_headers = ["content-length"]
-
     updated_response.headers.update(
-        dict(
+        [
             (k, v)
-            for k, v in new_response_headers.items()
-            # TODO: Don't think .lower() is necessary
-            if k.lower() not in excluded_headers
-        )
+            # multi_items() keys are already lowercase
+            for k, v in new_response_headers.multi_items()
+            if k not in NOT_MODIFIED_EXCLUDED_HEADERS
+        ]
     )
 
     # we want a 200 b/c we have content via the cache
@@ -548,23 +627,43 @@ def check_vary_headers(request_headers: Headers, cached_vary_data: dict) -> bool
     # Ensure that the Vary headers for the cached response match our
     # request
     # TODO: this should not be here, no reason for request headers to be so deep in deserialization.
+    if not cached_vary_data:
+        return True
+
+    # Headers lookups scan every header, so index them once up front. Vary
+    # header names are stored lowercased (see get_vary_headers).
+    headers = dict(request_headers.items())
     for header, value in cached_vary_data.items():
-        if request_headers.get(header, None) != value:
+        if headers.get(header) != value:
             return False
 
     return True
 
 
 def get_vary_headers(request_headers: Headers, response: Response):
-    """Get vary headers values for persisting in the cache for later checking"""
+    """
+    Get vary headers values for persisting in the cache for later checking.
+
+    Header names are lowercased so they can be checked without normalising
+    them again on every lookup.
+    """
     vary = {}
 
     # Construct our vary headers
-    if "vary" in response.headers:
-        varied_headers = response.headers["vary"].split(",")
-        for header in varied_headers:
-            header = header.strip()
-            header_value = request_headers.get(header, None)
-            vary[header] = header_value
+    vary_value = response.headers.get("vary")
+    if vary_value is not None:
+        headers = dict(request_headers.items())
+        for header in _parse_vary(vary_value):
+            vary[header] = headers.get(header)
 
     return vary
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_vary(vary_value: str) -> Tuple[str, ...]:
+    """
+    Split a Vary header value into lowercased header names.
+
+    A site tends to send the same few Vary values, so they're memoized.
+    """
+    return tuple(header.strip().lower() for header in vary_value.split(","))
@@ -1,91 +1,411 @@
 # SPDX-FileCopyrightText: 2015 Eric Larson
 #
 # SPDX-License-Identifier: Apache-2.0
-from typing import Optional, Tuple
+import functools
+import struct
+import threading
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
-import msgpack
+import msgspec
 from httpx import ByteStream, Headers
 
 from ._models import Response
+from ._utils import http_date_to_epoch
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+# Entries start with this magic followed by a single version byte. 0xc1 is never
+# used by msgpack so it can't be mistaken for the start of unprefixed v0 data.
+_MAGIC = b"\xc1HC"
+_HEADER_V2 = _MAGIC + bytes([2])
+
+# Length of the msgpack encoded metadata that precedes the raw body in v2 data.
+_META_LENGTH = struct.Struct(">I")
+
+
+class CachedResponse(msgspec.Struct, array_like=True, gc=False):
+    """
+    Metadata stored ahead of the body of a cached response.
+
+    Instances never take part in reference cycles, so they are kept out of
+    the garbage collector's tracking (`gc=False`).
+    """
+
+    status_code: int
+    headers: List[Tuple[bytes, bytes]]
+    extensions: Dict[str, Any]
+    vary: Dict[str, Optional[str]]
+    body_encoding: Optional[str] = None
+    date_epoch: Optional[int] = None
+    expires_epoch: Optional[int] = None
+
+
+# msgspec encoders/decoders are reusable and thread safe, so share them.
+_ENCODER = msgspec.msgpack.Encoder()
+_DECODER = msgspec.msgpack.Decoder()
+_CACHED_RESPONSE_DECODER = msgspec.msgpack.Decoder(CachedResponse)
+
+# Transport specific extensions that can't (and shouldn't) be cached.
+_TRANSIENT_EXTENSIONS = frozenset({"real_request", "close", "aclose", "network_stream"})
+
+
+class CachedByteStream(ByteStream):
+    """
+    A single chunk stream over the cached body.
+
+    The body may be a view into the cached data, in which case it is only
+    copied out if the stream is actually read. Likewise a body stored with an
+    `encoding` is only decoded (by `decode`) once it's needed, until then it
+    can be stored again as is.
+    """
+
+    def __init__(
+        self,
+        body: Union[bytes, memoryview],
+        encoding: Optional[str] = None,
+        decode: Optional[Callable[[Union[bytes, memoryview]], bytes]] = None,
+    ) -> None:
+        self._stream = body
+        self.encoding = encoding
+        self._decode = decode
+
+    @property
+    def body(self) -> Union[bytes, memoryview]:
+        if self._decode is not None:
+            self._stream = self._decode(self._stream)
+            self._decode = None
+            self.encoding = None
+        return self._stream
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield bytes(self.body)
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        yield bytes(self.body)
 
 
 class Serializer(object):
-    def dumps(self, response: Response, vary_header_data: dict, response_body: bytes):
-        extensions = response.extensions.copy()
-        extensions.pop("real_request", None)
-        extensions.pop("close", None)
-        extensions.pop("aclose", None)
-        extensions.pop("network_stream", None)
-
-        data = {
-            "response": {
-                "body": response_body,
-                "headers": response.headers.raw,
-                "status_code": response.status_code,
-                # TODO: Make sure we don't explode if there's something naughty in extensions
-                "extensions": extensions,
-            },
-            "vary": vary_header_data,
-        }
-
-        return b",".join([b"cc=0", msgpack.dumps(data, use_bin_type=True)])
-
-    def loads(self, data: bytes) -> Tuple[Optional[Response], Optional[dict]]:
+    # Map version numbers to their loaders, e.g. {0: Serializer._loads_v0}.
+    _loaders: Dict[int, Callable] = {}
+
+    def __init__(
+        self,
+        compression: Optional[str] = None,
+        compression_dict: Optional[bytes] = None,
+        compression_threshold: int = 1024,
+    ) -> None:
+        """
+        `compression="zstd"` compresses cached bodies with zstandard, optionally
+        using a dictionary trained on sample responses (see
+        `zstandard.train_dictionary`). Bodies no larger than
+        `compression_threshold` bytes are stored as is, as compressing them
+        costs more than it saves.
+        """
+        if compression not in (None, "zstd"):
+            raise ValueError(f"Unsupported compression: {compression}")
+        if compression and zstandard is None:
+            raise ImportError(
+                "zstd compression requires zstandard, "
+                "install with `pip install httpx-caching[zstd]`"
+            )
+        self.compression = compression
+        self.compression_dict = compression_dict
+        self.compression_threshold = compression_threshold
+        # zstandard (de)compressors aren't thread safe, so each thread gets its own.
+        self._local = threading.local()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._loaders = _collect_loaders(cls)
+
+    def dumps(
+        self,
+        response: Response,
+        vary_header_data: dict,
+        response_body: Union[bytes, bytearray, memoryview],
+        body_encoding: Optional[str] = None,
+    ):
+        """
+        Serialize a response for storage.
+
+        `response_body` may be any bytes-like object, it is copied exactly once,
+        into the returned blob. A `body_encoding` means the body is already
+        encoded (e.g. it came from the cache), so it is stored as is.
+        """
+        if (
+            body_encoding is None
+            and self.compression
+            and len(response_body) > self.compression_threshold
+        ):
+            response_body = self._compressor().compress(response_body)
+            body_encoding = self.compression
+
+        # TODO: Make sure we don't explode if there's something naughty in extensions
+        meta = _ENCODER.encode(_describe(response, vary_header_data, body_encoding))
+
+        # The body is kept out of the msgpack payload so that it is only copied
+        # once, straight into the final blob.
+        return b"".join([_HEADER_V2, _META_LENGTH.pack(len(meta)), meta, response_body])
+
+    def loads(self, data: Optional[bytes]) -> Tuple[Optional[Response], Optional[dict]]:
         # Short circuit if we've been given an empty set of data
         if not data:
             return None, None
 
         # Determine what version of the serializer the data was serialized
-        # with
-        try:
-            ver, data = data.split(b",", 1)
-        except ValueError:
-            ver = b"cc=0"
-
-        # Make sure that our "ver" is actually a version and isn't a false
-        # positive from a , being in the data stream.
-        if ver[:3] != b"cc=":
-            data = ver + data
-            ver = b"cc=0"
-
-        # Get the version number out of the cc=N
-        version = ver.split(b"=", 1)[-1].decode("ascii")
+        # with. Only the short header is inspected; the payload is passed on
+        # as a memoryview rather than split off into a copy.
+        if data[:3] == _MAGIC and len(data) > 3:
+            version = data[3]
+            data = memoryview(data)[4:]
+        elif data.startswith(b"cc="):
+            # Older entries use a textual "cc=N," prefix.
+            comma = data.find(b",", 3, 16)
+            if comma < 0:
+                return None, None
+            try:
+                version = int(data[3:comma])
+            except ValueError:
+                return None, None
+            payload_start = comma + 1
+            data = memoryview(data)[payload_start:]
+        else:
+            version = 0
 
         # Dispatch to the actual load method for the given version
-        try:
-            return getattr(self, "_loads_v{}".format(version))(data)
-
-        except AttributeError:
+        loader = self._loaders.get(version)
+        if loader is None:
             # This is a version we don't have a loads function for, so we'll
             # just treat it as a miss and return None
             return None, None
+        return loader(self, data)
 
     def prepare_response(self, cached_data: dict):
         """Construct a response from cached data"""
 
         cached_response = cached_data["response"]
 
-        status_code = cached_response["status_code"]
-        headers = cached_response["headers"]
-        stream = ByteStream(cached_response["body"])
-        extensions = cached_response["extensions"]
+        response = self._build_response(
+            cached_response["status_code"],
+            _prepare_headers(cached_response["headers"]),
+            cached_response["body"],
+            cached_response["extensions"],
+        )
 
-        response = Response(
+        # Older entries kept vary header names as sent by the server.
+        vary = {header.lower(): value for header, value in cached_data["vary"].items()}
+        return response, vary
+
+    def _build_response(
+        self,
+        status_code,
+        headers,
+        body,
+        extensions,
+        date_epoch=None,
+        expires_epoch=None,
+        body_encoding=None,
+        decode_body=None,
+    ) -> Response:
+        return Response(
             status_code=status_code,
-            headers=Headers(headers),
-            stream=stream,
+            headers=headers,
+            stream=CachedByteStream(body, body_encoding, decode_body),
             extensions=extensions,
+            date_epoch=date_epoch,
+            expires_epoch=expires_epoch,
         )
 
-        if response.headers.get("transfer-encoding") == "chunked":
-            response.headers.pop("transfer-encoding")
-
-        return response, cached_data["vary"]
-
     def _loads_v0(self, data):
         try:
-            cached = msgpack.loads(data, raw=False)
-        except ValueError:
-            return
+            cached = _DECODER.decode(data)
+        except msgspec.DecodeError:
+            return None, None
 
         return self.prepare_response(cached)
+
+    def _loads_v2(self, data):
+        try:
+            meta, body = _split_meta(data)
+            cached, headers = _decode_meta(bytes(meta))
+        except (struct.error, msgspec.DecodeError):
+            return None, None
+
+        body_encoding = cached.body_encoding
+        decode_body = None
+        if body_encoding is not None:
+            if not self._can_decode(body_encoding):
+                return None, None
+            # Plenty of entries turn out to be stale and are never read, so
+            # only decode the body when it's wanted.
+            decode_body = functools.partial(
+                self._decode_body, body_encoding=body_encoding
+            )
+
+        # The decoded metadata is shared between hits, so copy what the
+        # response may mutate.
+        response = self._build_response(
+            cached.status_code,
+            Headers(headers),
+            body,
+            dict(cached.extensions),
+            cached.date_epoch,
+            cached.expires_epoch,
+            body_encoding,
+            decode_body,
+        )
+        return response, cached.vary
+
+    def _can_decode(self, body_encoding):
+        return body_encoding == "zstd" and zstandard is not None
+
+    def _decode_body(self, body, body_encoding):
+        if body_encoding is None:
+            return body
+        if not self._can_decode(body_encoding):
+            # Encoded with something we can't decode here.
+            return None
+        return self._decompressor().decompress(body)
+
+    def _zstd_dict(self):
+        if self.compression_dict is None:
+            return None
+        return zstandard.ZstdCompressionDict(self.compression_dict)
+
+    def _compressor(self):
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = zstandard.ZstdCompressor(level=3, dict_data=self._zstd_dict())
+            self._local.compressor = compressor
+        return compressor
+
+    def _decompressor(self):
+        decompressor = getattr(self._local, "decompressor", None)
+        if decompressor is None:
+            decompressor = zstandard.ZstdDecompressor(dict_data=self._zstd_dict())
+            self._local.decompressor = decompressor
+        return decompressor
+
+
+def _collect_loaders(cls) -> Dict[int, Callable]:
+    return {
+        int(name.rpartition("_v")[2]): getattr(cls, name)
+        for name in dir(cls)
+        if name.startswith("_loads_v")
+    }
+
+
+Serializer._loaders = _collect_loaders(Serializer)
+
+
+class InMemorySerializer(object):
+    """
+    Keeps cached responses as Python objects rather than bytes.
+
+    Only suitable for caches living in this process (like DictCache), where
+    encoding entries buys nothing. Each hit still gets its own Response.
+    """
+
+    def dumps(
+        self,
+        response: Response,
+        vary_header_data: dict,
+        response_body: Union[bytes, bytearray, memoryview],
+        body_encoding: Optional[str] = None,
+    ):
+        if body_encoding is not None:
+            raise ValueError("InMemorySerializer can't store encoded bodies")
+        cached = _describe(response, vary_header_data, None)
+        return cached, Headers(cached.headers), bytes(response_body)
+
+    def loads(self, data) -> Tuple[Optional[Response], Optional[dict]]:
+        if not data:
+            return None, None
+        cached, headers, body = data
+        response = Response(
+            status_code=cached.status_code,
+            headers=Headers(headers),
+            stream=CachedByteStream(body),
+            extensions=dict(cached.extensions),
+            date_epoch=cached.date_epoch,
+            expires_epoch=cached.expires_epoch,
+        )
+        return response, cached.vary
+
+
+def _describe(
+    response: Response, vary_header_data: dict, body_encoding: Optional[str]
+) -> CachedResponse:
+    """
+    Collect everything but the body that needs to be kept about a response.
+    """
+    raw_headers = response.headers.raw
+    if response.headers.get("transfer-encoding") == "chunked":
+        # The body is stored whole, so it's never served chunked.
+        raw_headers = [
+            (name, value)
+            for name, value in raw_headers
+            if name.lower() != b"transfer-encoding"
+        ]
+
+    return CachedResponse(
+        status_code=response.status_code,
+        headers=raw_headers,
+        extensions={
+            k: v
+            for k, v in response.extensions.items()
+            if k not in _TRANSIENT_EXTENSIONS
+        },
+        vary=vary_header_data,
+        body_encoding=body_encoding,
+        # Parsed once here rather than on every freshness check.
+        date_epoch=http_date_to_epoch(response.headers.get("date")),
+        expires_epoch=http_date_to_epoch(response.headers.get("expires")),
+    )
+
+
+def _prepare_headers(raw_headers) -> Headers:
+    """
+    Build headers for a legacy (v0) entry, which may still say it's chunked.
+    """
+    headers = Headers(raw_headers)
+    if headers.get("transfer-encoding") == "chunked":
+        headers.pop("transfer-encoding")
+    return headers
+
+
+@functools.lru_cache(maxsize=256)
+def _decode_meta(meta: bytes) -> Tuple[CachedResponse, Headers]:
+    """
+    Decode v2 metadata and build its headers.
+
+    Hot entries are served with identical metadata over and over, so this is
+    memoized on the metadata bytes. Callers must not mutate the results.
+    """
+    cached = _CACHED_RESPONSE_DECODER.decode(meta)
+    # Chunked transfer-encoding was already dropped by `dumps`.
+    return cached, Headers(cached.headers)
+
+
+def _split_meta(data):
+    """
+    Split v2 data into views of its metadata and body.
+    """
+    view = memoryview(data)
+    (meta_length,) = _META_LENGTH.unpack_from(view)
+    meta_start = _META_LENGTH.size
+    body_start = meta_start + meta_length
+    return view[meta_start:body_start], view[body_start:]
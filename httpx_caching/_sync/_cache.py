@@ -1,36 +1,71 @@
-from typing import Optional, Tuple
+from collections import OrderedDict
+from typing import Any, Optional, Tuple, Union
 
 from httpx_caching._models import Response
-from httpx_caching._serializer import Serializer
-from httpx_caching._utils import SyncLock
+from httpx_caching._serializer import InMemorySerializer, Serializer
+
+# Entries never leave the process, so by default they aren't encoded at all.
+# Serializers hold no per-cache state, so caches share one.
+_DEFAULT_SERIALIZER = InMemorySerializer()
 
 
 class SyncDictCache:
-    def __init__(self, serializer: Optional[Serializer] = None) -> None:
-        self.serializer = serializer if serializer else Serializer()
-        self.data: dict = {}
-        self.lock = None
+    """
+    In-memory cache storage.
+
+    When `max_entries` is given, the least recently used entries are evicted to
+    stay within it.
 
-    def get_lock(self):
-        if not self.lock:
-            self.lock = SyncLock()
-        return self.lock
+    No locking is needed: a single dict lookup, assignment or pop is atomic in
+    CPython, and none of them straddle an await. Reordering entries can race
+    with a delete, which only loses the entry's place in the LRU order.
+    """
+
+    def __init__(
+        self,
+        serializer: Optional[Union[Serializer, InMemorySerializer]] = None,
+        max_entries: Optional[int] = None,
+    ) -> None:
+        self.serializer = serializer if serializer else _DEFAULT_SERIALIZER
+        self.max_entries = max_entries
+        self.data: "OrderedDict[str, Any]" = OrderedDict()
 
     def get(self, key: str) -> Tuple[Optional[Response], Optional[dict]]:
-        return self.serializer.loads(self.data.get(key, None))
+        data = self.data.get(key, None)
+        if data is None:
+            return None, None
+        if self.max_entries:
+            self._touch(key)
+        return self.serializer.loads(data)
 
     def set(
-        self, key: str, response: Response, vary_header_data: dict, response_body: bytes
+        self,
+        key: str,
+        response: Response,
+        vary_header_data: dict,
+        response_body: bytes,
+        body_encoding: Optional[str] = None,
     ) -> None:
-        with self.get_lock():
-            self.data.update(
-                {key: self.serializer.dumps(response, vary_header_data, response_body)}
-            )
+        self.data[key] = self.serializer.dumps(
+            response, vary_header_data, response_body, body_encoding
+        )
+        if self.max_entries:
+            self._touch(key)
+            while len(self.data) > self.max_entries:
+                try:
+                    self.data.popitem(last=False)
+                except KeyError:
+                    break
 
     def delete(self, key: str) -> None:
-        with self.get_lock():
-            if key in self.data:
-                self.data.pop(key)
+        self.data.pop(key, None)
+
+    def _touch(self, key: str) -> None:
+        try:
+            self.data.move_to_end(key)
+        except KeyError:
+            # Deleted in the meantime.
+            pass
 
     def close(self):
         pass
@@ -1,13 +1,16 @@
+import calendar
+import functools
 import logging
 import threading
+from email.utils import parsedate_tz
 from typing import (
     AsyncIterator,
     Awaitable,
     Callable,
     Generator,
     Iterator,
+    List,
     Optional,
-    Tuple,
     TypeVar,
     Union,
 )
@@ -17,8 +20,90 @@ import httpx
 
 logger = logging.getLogger(__name__)
 
+
+_MONTHS = {
+    month: number
+    for number, month in enumerate(
+        ["Jan", "Feb", "Mar", "Apr", "May", "Jun"]
+        + ["Jul", "Aug", "Sep", "Oct", "Nov", "Dec"],
+        start=1,
+    )
+}
+
+
+@functools.lru_cache(maxsize=1024)
+def http_date_to_epoch(value: Optional[str]) -> Optional[int]:
+    """
+    Parse an HTTP date header value into seconds since the epoch.
+
+    Returns None if the value is missing or can't be parsed. Expires and
+    Last-Modified values repeat across responses, so results are memoized.
+    """
+    if not value:
+        return None
+
+    # Senders must use IMF-fixdate ("Sun, 06 Nov 1994 08:49:37 GMT"), which
+    # can be picked apart directly. Anything else goes to the email parser.
+    parts = value.split()
+    if not parts:
+        return None
+    if (
+        len(parts) == 6
+        and parts[5] == "GMT"
+        and len(parts[1]) == 2
+        and len(parts[3]) == 4
+        and len(parts[4]) == 8
+    ):
+        try:
+            hour, minute, second = parts[4].split(":")
+            return calendar.timegm(
+                (
+                    int(parts[3]),
+                    _MONTHS[parts[2]],
+                    int(parts[1]),
+                    int(hour),
+                    int(minute),
+                    int(second),
+                )
+            )
+        except (KeyError, ValueError):
+            pass
+
+    try:
+        parsed = parsedate_tz(value)
+    except (IndexError, ValueError):
+        # Some Python versions choke on malformed values instead of
+        # returning None.
+        return None
+    if parsed is None:
+        return None
+    # Honour any numeric UTC offset the date was given with.
+    return calendar.timegm(parsed[:6]) - (parsed[9] or 0)
+
+
 AsyncLock = anyio.Lock
 SyncLock = threading.Lock
+SyncEvent = threading.Event
+
+
+class AsyncEvent:
+    """
+    An anyio.Event whose wait accepts a timeout, like threading.Event.
+    """
+
+    def __init__(self) -> None:
+        self._event = anyio.Event()
+
+    def set(self) -> None:
+        self._event.set()
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        with anyio.move_on_after(timeout):
+            await self._event.wait()
+        return self._event.is_set()
 
 
 class ByteStreamWrapper(httpx.ByteStream):
@@ -26,44 +111,102 @@ class ByteStreamWrapper(httpx.ByteStream):
         self,
         stream: Union[httpx.SyncByteStream, httpx.AsyncByteStream],
         callback: Optional[Callable] = None,
+        max_size: Optional[int] = None,
     ) -> None:
         """
         A wrapper around a stream that calls a callback once with
         the full contents of the stream after it has been fully read.
+
+        If the stream grows past `max_size` bytes buffering is abandoned
+        and the callback is never called.
+
+        `on_finish` may be set to a plain function to be notified once the
+        body has been read to the end or the stream has been closed,
+        whichever comes first.
         """
         self.stream = stream
         self.callback = callback or (lambda *args, **kwargs: None)
+        self.max_size = max_size
+        self.on_finish: Optional[Callable[[], None]] = None
 
-        self.buffer = bytearray()
+        # Keep references to the chunks and join them once at the end, rather
+        # than growing (and finally copying) a single bytearray.
+        self.buffer: Optional[List[bytes]] = []
+        self.size = 0
         self.callback_called = False
 
+    def _take_body(self) -> bytes:
+        """
+        Return the buffered body and stop buffering.
+        """
+        buffer, self.buffer = self.buffer, None
+        if not buffer:
+            return b""
+        # join hands back a lone chunk as-is, so single chunk bodies aren't copied.
+        return b"".join(buffer)
+
+    def _discard_buffer(self) -> None:
+        """
+        Stop buffering and drop anything buffered so far, without joining it.
+        """
+        self.buffer = None
+
+    def _buffer_chunk(self, chunk: bytes) -> None:
+        self.buffer.append(chunk)  # type: ignore
+        self.size += len(chunk)
+        if self.max_size is not None and self.size > self.max_size:
+            logger.debug("Response body exceeds %i bytes, not caching", self.max_size)
+            self._discard_buffer()
+
+    def _finished(self) -> None:
+        if self.on_finish is not None:
+            on_finish, self.on_finish = self.on_finish, None
+            on_finish()
+
     def _on_read_finish(self):
-        if not self.callback_called:
-            self.callback(bytes(self.buffer))
+        # No buffer means the callback already ran or the stream was closed early.
+        if not self.callback_called and self.buffer is not None:
+            body = self._take_body()
+            self.callback(body)
             self.callback_called = True
+        self._finished()
 
     async def _a_on_read_finish(self):
-        if not self.callback_called:
-            await self.callback(bytes(self.buffer))
+        if not self.callback_called and self.buffer is not None:
+            body = self._take_body()
+            await self.callback(body)
             self.callback_called = True
+        self._finished()
 
     def __iter__(self) -> Iterator[bytes]:
         for chunk in self.stream:  # type: ignore
-            self.buffer.extend(chunk)
+            if self.buffer is not None:
+                self._buffer_chunk(chunk)
             yield chunk
         self._on_read_finish()
 
     async def __aiter__(self) -> AsyncIterator[bytes]:
         async for chunk in self.stream:  # type: ignore
-            self.buffer.extend(chunk)
+            if self.buffer is not None:
+                self._buffer_chunk(chunk)
             yield chunk
         await self._a_on_read_finish()
 
+    def _closed(self) -> None:
+        self._discard_buffer()
+        self._finished()
+
     def close(self) -> None:
-        self.stream.close()  # type: ignore
+        try:
+            self.stream.close()  # type: ignore
+        finally:
+            self._closed()
 
     async def aclose(self) -> None:
-        await self.stream.aclose()  # type: ignore
+        try:
+            await self.stream.aclose()  # type: ignore
+        finally:
+            self._closed()
 
 
 YieldType = TypeVar("YieldType")
@@ -77,12 +220,16 @@ async def async_callback_generator(
     kwargs: dict,
 ):
     gen = genfunction(**kwargs)
+    # Checked once per run rather than twice per step.
+    debug = logger.isEnabledFor(logging.DEBUG)
     try:
         yielded = next(gen)
         while True:
-            logger.debug("action:", yielded)
+            if debug:
+                logger.debug("action: %s", yielded)
             to_send = await callback(yielded)
-            logger.debug("result:", to_send)
+            if debug:
+                logger.debug("result: %s", to_send)
             yielded = gen.send(to_send)
     except StopIteration as e:
         return e.value
@@ -94,22 +241,16 @@ def sync_callback_generator(
     kwargs: dict,
 ):
     gen = genfunction(**kwargs)
+    # Checked once per run rather than twice per step.
+    debug = logger.isEnabledFor(logging.DEBUG)
     try:
         yielded = next(gen)
         while True:
-            logger.debug("action:", yielded)
+            if debug:
+                logger.debug("action: %s", yielded)
             to_send = callback(yielded)
-            logger.debug("result:", to_send)
+            if debug:
+                logger.debug("result: %s", to_send)
             yielded = gen.send(to_send)
     except StopIteration as e:
         return e.value
-
-
-def request_to_raw(request: httpx.Request) -> Tuple:
-    return (
-        request.method.encode("ascii"),
-        request.url.raw,
-        request.headers.raw,
-        request.stream,
-        {},  # TODO: need to sort out ext preservation
-    )
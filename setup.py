@@ -37,7 +37,7 @@ def get_packages(package):
 
 setup(
     name="httpx-caching",
-    python_requires=">=3.7",
+    python_requires=">=3.8",
     version=get_version("httpx_caching"),
     url="https://github.com/johtso/httpx-caching",
     project_urls={
@@ -55,11 +55,12 @@ setup(
     zip_safe=False,
     install_requires=[
         "httpx>=0.22.0",
-        "msgpack",  
+        "msgspec>=0.18",
         "anyio",
-        "multimethod",
     ],
-    extras_require={},
+    extras_require={
+        "zstd": ["zstandard"],
+    },
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Environment :: Web Environment",
@@ -68,7 +69,6 @@ setup(
         "Operating System :: OS Independent",
         "Topic :: Internet :: WWW/HTTP",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
@@ -0,0 +1,27 @@
+import httpx
+
+from httpx_caching import AsyncDictCache
+from httpx_caching._models import Response
+
+
+def make_response():
+    return Response(200, httpx.Headers(), httpx.ByteStream(b""))
+
+
+class TestDictCache(object):
+    async def test_unbounded_by_default(self):
+        cache = AsyncDictCache()
+        for key in "abc":
+            await cache.aset(key, make_response(), {}, b"")
+        assert list(cache.data) == ["a", "b", "c"]
+
+    async def test_evicts_least_recently_used(self):
+        cache = AsyncDictCache(max_entries=2)
+        await cache.aset("a", make_response(), {}, b"")
+        await cache.aset("b", make_response(), {}, b"")
+        await cache.aget("a")
+        await cache.aset("c", make_response(), {}, b"")
+
+        assert list(cache.data) == ["a", "c"]
+        response, _vary = await cache.aget("b")
+        assert response is None
@@ -4,7 +4,7 @@
 """
 Test for supporting streamed responses (Transfer-Encoding: chunked)
 """
-from tests.conftest import cache_hit
+from tests.conftest import cache_hit, make_async_client
 
 
 class TestChunkedResponses(object):
@@ -20,6 +20,7 @@ class TestChunkedResponses(object):
 
         r = await async_client.get(url, headers={"Cache-Control": "max-age=3600"})
         assert cache_hit(r)
+        assert "transfer-encoding" not in r.headers
 
     # TODO: Test that stream is only cached the first time it is iterated over
     async def test_stream_is_cached(self, url, async_client):
@@ -40,3 +41,11 @@ class TestChunkedResponses(object):
             pass
         async with async_client.stream("GET", url + "stream") as resp:
             assert not cache_hit(resp)
+
+    async def test_stream_over_max_body_size_is_not_cached(self, url):
+        async_client = make_async_client(max_body_size=5)
+        async with async_client.stream("GET", url + "stream") as resp:
+            await resp.aread()
+        async with async_client.stream("GET", url + "stream") as resp:
+            assert not cache_hit(resp)
+        await async_client.aclose()
@@ -2,11 +2,17 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+from email.utils import formatdate
+
+import httpx
 import mock
 import pytest
 
 from httpx_caching import AsyncDictCache
-from tests.conftest import cache_hit
+from httpx_caching._models import Response
+from httpx_caching._policy import CacheSet
+from httpx_caching._utils import ByteStreamWrapper
+from tests.conftest import cache_hit, make_async_client
 
 
 class TestClientActions(object):
@@ -38,6 +44,57 @@ class TestClientActions(object):
         r3 = await async_client.get(url)
         assert not cache_hit(r3)
 
+    async def test_get_over_max_body_size_does_not_cache(self, url):
+        async_client = make_async_client(max_body_size=10)
+        await async_client.get(url)
+        r2 = await async_client.get(url)
+        assert not cache_hit(r2)
+        await async_client.aclose()
+
+    async def test_get_truncated_body_does_not_cache(self):
+        def handler(request):
+            return httpx.Response(
+                200,
+                headers={
+                    "Content-Length": "10",
+                    "Cache-Control": "max-age=3600",
+                    "Date": formatdate(usegmt=True),
+                },
+                content=b"short",
+            )
+
+        async_client = make_async_client(transport=httpx.MockTransport(handler))
+        await async_client.get("http://example.com/")
+        r2 = await async_client.get("http://example.com/")
+        assert not cache_hit(r2)
+        await async_client.aclose()
+
+    async def test_header_changes_before_read_are_not_cached(self, url):
+        async_client = make_async_client()
+        async with async_client.stream("GET", url) as r:
+            r.headers["x-changed"] = "yes"
+            await r.aread()
+
+        r2 = await async_client.get(url)
+        assert cache_hit(r2)
+        assert r2.headers.get("x-changed") is None
+        await async_client.aclose()
+
+    async def test_cache_set_joins_wrapped_stream(self):
+        async_client = make_async_client()
+        transport = async_client._transport
+        response = Response(
+            status_code=200,
+            headers=httpx.Headers(),
+            stream=ByteStreamWrapper(httpx.ByteStream(b"foo")),
+        )
+
+        await transport._io_cache_set(CacheSet("http://example.com/", response, {}))
+        cached, _vary = await transport.cache.aget("http://example.com/")
+        assert cached is not None
+        assert b"".join(cached.stream) == b"foo"
+        await async_client.aclose()
+
     @pytest.mark.xfail
     async def test_close(self, url, async_client):
         mock_cache = mock.Mock(spec=AsyncDictCache)
@@ -0,0 +1,44 @@
+import gc
+import time
+
+from tests.conftest import cache_hit, make_async_client
+
+
+class TestCoalescing(object):
+    async def test_coalescing_is_disabled_by_default(self, url):
+        async_client = make_async_client()
+        async with async_client.stream("GET", url):
+            r = await async_client.get(url)
+        assert not cache_hit(r)
+        await async_client.aclose()
+
+    async def test_waiter_gives_up_after_timeout(self, url):
+        async_client = make_async_client(coalesce_timeout=0.1)
+        async with async_client.stream("GET", url):
+            start = time.monotonic()
+            r = await async_client.get(url)
+            assert time.monotonic() - start >= 0.1
+        assert not cache_hit(r)
+        await async_client.aclose()
+
+    async def test_read_body_releases_inflight_request(self, url):
+        async_client = make_async_client(coalesce_timeout=5)
+        async with async_client.stream("GET", url) as r:
+            await r.aread()
+            start = time.monotonic()
+            r2 = await async_client.get(url)
+            assert time.monotonic() - start < 1
+        assert cache_hit(r2)
+        await async_client.aclose()
+
+    async def test_dropped_response_releases_inflight_request(self, url):
+        async_client = make_async_client(coalesce_timeout=5)
+        request = async_client.build_request("GET", url)
+        r = await async_client.send(request, stream=True)
+        del r
+        gc.collect()
+
+        start = time.monotonic()
+        await async_client.get(url)
+        assert time.monotonic() - start < 1
+        await async_client.aclose()
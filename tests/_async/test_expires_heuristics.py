@@ -76,6 +76,15 @@ class TestOneDayCache(object):
         pprint(dict(r.headers))
         assert cache_hit(r)
 
+    def test_one_day_after_date(self):
+        headers = OneDayCacheHeuristic().update_headers(
+            httpx.Headers({"date": "Sun, 06 Nov 1994 08:49:37 GMT"}), 200
+        )
+        assert headers["expires"] == "Mon, 07 Nov 1994 08:49:37 GMT"
+
+    def test_no_date(self):
+        assert OneDayCacheHeuristic().update_headers(httpx.Headers(), 200) == {}
+
 
 class TestExpiresAfter(object):
     def setup(self):
@@ -0,0 +1,27 @@
+import httpx
+
+from httpx_caching import SyncDictCache
+from httpx_caching._models import Response
+
+
+def make_response():
+    return Response(200, httpx.Headers(), httpx.ByteStream(b""))
+
+
+class TestDictCache(object):
+    def test_unbounded_by_default(self):
+        cache = SyncDictCache()
+        for key in "abc":
+            cache.set(key, make_response(), {}, b"")
+        assert list(cache.data) == ["a", "b", "c"]
+
+    def test_evicts_least_recently_used(self):
+        cache = SyncDictCache(max_entries=2)
+        cache.set("a", make_response(), {}, b"")
+        cache.set("b", make_response(), {}, b"")
+        cache.get("a")
+        cache.set("c", make_response(), {}, b"")
+
+        assert list(cache.data) == ["a", "c"]
+        response, _vary = cache.get("b")
+        assert response is None
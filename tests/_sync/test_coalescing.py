@@ -0,0 +1,44 @@
+import gc
+import time
+
+from tests.conftest import cache_hit, make_client
+
+
+class TestCoalescing(object):
+    def test_coalescing_is_disabled_by_default(self, url):
+        client = make_client()
+        with client.stream("GET", url):
+            r = client.get(url)
+        assert not cache_hit(r)
+        client.close()
+
+    def test_waiter_gives_up_after_timeout(self, url):
+        client = make_client(coalesce_timeout=0.1)
+        with client.stream("GET", url):
+            start = time.monotonic()
+            r = client.get(url)
+            assert time.monotonic() - start >= 0.1
+        assert not cache_hit(r)
+        client.close()
+
+    def test_read_body_releases_inflight_request(self, url):
+        client = make_client(coalesce_timeout=5)
+        with client.stream("GET", url) as r:
+            r.read()
+            start = time.monotonic()
+            r2 = client.get(url)
+            assert time.monotonic() - start < 1
+        assert cache_hit(r2)
+        client.close()
+
+    def test_dropped_response_releases_inflight_request(self, url):
+        client = make_client(coalesce_timeout=5)
+        request = client.build_request("GET", url)
+        r = client.send(request, stream=True)
+        del r
+        gc.collect()
+
+        start = time.monotonic()
+        client.get(url)
+        assert time.monotonic() - start < 1
+        client.close()
@@ -0,0 +1,24 @@
+import threading
+
+from .conftest import cache_hit, make_client
+
+
+class TestCoalescing(object):
+    def test_concurrent_request_waits_for_inflight_request(self, url):
+        client = make_client(coalesce_timeout=5)
+        responses = []
+
+        with client.stream("GET", url) as leader:
+            follower = threading.Thread(
+                target=lambda: responses.append(client.get(url))
+            )
+            follower.start()
+            follower.join(0.2)
+            # The follower is held back until the leader's body is cached.
+            assert follower.is_alive()
+            leader.read()
+
+        follower.join()
+        assert not cache_hit(leader)
+        assert cache_hit(responses[0])
+        client.close()
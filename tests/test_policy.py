@@ -0,0 +1,155 @@
+import httpx
+import pytest
+
+from httpx_caching._models import Response
+from httpx_caching._policy import (
+    CacheDelete,
+    CacheGet,
+    Evaluation,
+    MakeRequest,
+    Source,
+    caching_policy,
+    get_vary_headers,
+    parse_cache_control_directives,
+    try_from_cache_policy,
+    try_from_server_policy,
+    update_with_304_response,
+)
+
+
+class TestParseCacheControlDirectives(object):
+    @pytest.mark.parametrize(
+        "value,expected",
+        [
+            ("", {}),
+            ("max-age=60", {"max-age": 60}),
+            (" Max-Age = 60 , no-cache", {"max-age": 60, "no-cache": None}),
+            ("max-stale, public,,", {"max-stale": None, "public": None}),
+            ('private="set-cookie", s-maxage=10', {"private": None, "s-maxage": 10}),
+            ("max-age", {}),
+            ("max-age=never", {}),
+            ("immutable, no-store", {"no-store": None}),
+        ],
+    )
+    def test_parse(self, value, expected):
+        headers = httpx.Headers({"cache-control": value})
+        assert parse_cache_control_directives(headers) == expected
+
+    def test_missing_header(self):
+        assert parse_cache_control_directives(httpx.Headers()) == {}
+
+
+class TestUpdateWith304Response(object):
+    def test_merges_headers(self):
+        cached = Response(
+            status_code=200,
+            headers=httpx.Headers({"Content-Length": "3", "ETag": '"a"'}),
+            stream=httpx.ByteStream(b"foo"),
+        )
+        not_modified = httpx.Headers(
+            [
+                ("Content-Length", "0"),
+                ("Date", "Sun, 06 Nov 1994 08:49:37 GMT"),
+                ("Warning", "110 - a"),
+                ("Warning", "110 - b"),
+            ]
+        )
+
+        updated = update_with_304_response(cached, not_modified)
+
+        assert updated.status_code == 200
+        assert updated.headers["content-length"] == "3"
+        assert updated.headers["etag"] == '"a"'
+        assert updated.headers["date"] == "Sun, 06 Nov 1994 08:49:37 GMT"
+        assert updated.headers.get_list("warning") == ["110 - a", "110 - b"]
+
+
+def test_uncacheable_method_goes_straight_to_server():
+    request = httpx.Request("POST", "http://example.com/")
+    policy = caching_policy(
+        request,
+        cache_etags=True,
+        heuristic=None,
+        cacheable_methods=frozenset({"GET"}),
+        cacheable_status_codes=frozenset({200}),
+    )
+
+    action = next(policy)
+    assert isinstance(action, MakeRequest)
+
+    server_response = Response(
+        status_code=200, headers=httpx.Headers(), stream=httpx.ByteStream(b"")
+    )
+    with pytest.raises(StopIteration) as exc:
+        policy.send(server_response)
+    assert exc.value.value == (server_response, Source.SERVER)
+
+
+def test_conditional_request_keeps_extensions():
+    request = httpx.Request(
+        "GET", "http://example.com/", extensions={"timeout": {"read": 1.0}}
+    )
+    cached = Response(
+        status_code=200,
+        headers=httpx.Headers({"ETag": '"a"'}),
+        stream=httpx.ByteStream(b"foo"),
+    )
+    policy = try_from_server_policy(
+        request,
+        "http://example.com/",
+        cached,
+        heuristic=None,
+        cache_etags=True,
+        cacheable_status_codes=frozenset({200}),
+        cacheable_methods=frozenset({"GET"}),
+    )
+
+    action = next(policy)
+    assert isinstance(action, MakeRequest)
+    assert action.request.headers["if-none-match"] == '"a"'
+    assert action.request.extensions == {"timeout": {"read": 1.0}}
+    assert "if-none-match" not in request.headers
+
+
+def test_get_vary_headers():
+    request_headers = httpx.Headers({"Accept": "text/html", "User-Agent": "test"})
+    response = Response(
+        status_code=200,
+        headers=httpx.Headers({"Vary": "Accept, accept-encoding"}),
+        stream=httpx.ByteStream(b""),
+    )
+
+    assert get_vary_headers(request_headers, response) == {
+        "accept": "text/html",
+        "accept-encoding": None,
+    }
+
+
+class TestMalformedDate(object):
+    def lookup(self, headers):
+        request = httpx.Request("GET", "http://example.com/")
+        cached = Response(
+            status_code=200,
+            headers=httpx.Headers(headers),
+            stream=httpx.ByteStream(b"foo"),
+        )
+        policy = try_from_cache_policy(
+            request, "http://example.com/", frozenset({"GET"})
+        )
+        assert isinstance(next(policy), CacheGet)
+        return cached, policy
+
+    def test_purged_without_etag(self):
+        cached, policy = self.lookup({"Date": "not a date"})
+
+        assert isinstance(policy.send((cached, {})), CacheDelete)
+        with pytest.raises(StopIteration) as exc:
+            next(policy)
+        assert exc.value.value == (None, None)
+
+    def test_revalidated_with_etag(self):
+        cached, policy = self.lookup({"Date": "not a date", "ETag": '"a"'})
+
+        with pytest.raises(StopIteration) as exc:
+            policy.send((cached, {}))
+        assert exc.value.value == (cached, Evaluation.INCONCLUSIVE)
@@ -3,10 +3,10 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import httpx
-import msgpack
+import msgspec
 
 from httpx_caching._models import Response
-from httpx_caching._serializer import Serializer
+from httpx_caching._serializer import CachedByteStream, InMemorySerializer, Serializer
 
 
 class TestSerializer(object):
@@ -28,7 +28,7 @@ class TestSerializer(object):
 
     def test_read_version_v0(self):
         resp, _vary_fields = self.serializer._loads_v0(
-            msgpack.dumps(self.response_data)
+            msgspec.msgpack.encode(self.response_data)
         )
         assert next(iter(resp.stream)) == b"Hello World"
 
@@ -43,3 +43,217 @@ class TestSerializer(object):
             {},
             b"foo",
         )
+
+    def test_dumps_loads_roundtrip(self):
+        data = self.serializer.dumps(
+            Response(
+                status_code=200,
+                headers=httpx.Headers({"Content-Type": "text/plain"}),
+                stream=httpx.ByteStream(b"foo"),
+                extensions={},
+            ),
+            {"Accept": "text/plain"},
+            b"foo",
+        )
+
+        resp, vary_fields = self.serializer.loads(data)
+        assert resp is not None
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "text/plain"
+        assert next(iter(resp.stream)) == b"foo"
+        assert vary_fields == {"Accept": "text/plain"}
+
+    def test_read_truncated_v2(self):
+        assert self.serializer.loads(b"\xc1HC\x02\x00") == (None, None)
+
+    def test_read_unknown_version(self):
+        assert self.serializer.loads(b"cc=9999,foo") == (None, None)
+        assert self.serializer.loads(b"\xc1HC\xfffoo") == (None, None)
+
+    def test_dumps_loads_zstd(self):
+        serializer = Serializer(compression="zstd")
+        body = b"Hello World" * 100
+        data = serializer.dumps(
+            Response(
+                status_code=200,
+                headers=httpx.Headers(),
+                stream=httpx.ByteStream(body),
+                extensions={},
+            ),
+            {},
+            body,
+        )
+
+        assert len(data) < len(body)
+        resp, _vary_fields = serializer.loads(data)
+        assert resp is not None
+        assert next(iter(resp.stream)) == body
+
+    def test_loads_zstd_decompresses_lazily(self):
+        serializer = Serializer(compression="zstd")
+        body = b"Hello World" * 100
+        data = serializer.dumps(
+            Response(
+                status_code=200,
+                headers=httpx.Headers(),
+                stream=httpx.ByteStream(body),
+                extensions={},
+            ),
+            {},
+            body,
+        )
+
+        resp, _vary_fields = serializer.loads(data)
+        assert resp is not None
+        assert isinstance(resp.stream, CachedByteStream)
+        assert bytes(resp.stream._stream) != body
+        assert resp.stream.body == body
+        assert next(iter(resp.stream)) == body
+
+    def test_dumps_already_encoded_body(self):
+        serializer = Serializer(compression="zstd")
+        body = b"Hello World" * 100
+        data = serializer.dumps(
+            Response(
+                status_code=200,
+                headers=httpx.Headers(),
+                stream=httpx.ByteStream(body),
+                extensions={},
+            ),
+            {},
+            body,
+        )
+        resp, _vary_fields = serializer.loads(data)
+        assert resp is not None
+        assert isinstance(resp.stream, CachedByteStream)
+        assert resp.stream.encoding == "zstd"
+
+        resp.headers["etag"] = "bar"
+        data = serializer.dumps(
+            resp, {}, resp.stream._stream, body_encoding=resp.stream.encoding
+        )
+
+        resp, _vary_fields = serializer.loads(data)
+        assert resp is not None
+        assert resp.headers["etag"] == "bar"
+        assert isinstance(resp.stream, CachedByteStream)
+        assert next(iter(resp.stream)) == body
+        assert resp.stream.encoding is None
+
+    def test_dumps_zstd_small_body_uncompressed(self):
+        serializer = Serializer(compression="zstd")
+        body = b"Hello World"
+        data = serializer.dumps(
+            Response(
+                status_code=200,
+                headers=httpx.Headers(),
+                stream=httpx.ByteStream(body),
+                extensions={},
+            ),
+            {},
+            body,
+        )
+
+        assert data.endswith(body)
+        resp, _vary_fields = serializer.loads(data)
+        assert resp is not None
+        assert next(iter(resp.stream)) == body
+
+    def test_loads_hits_are_independent(self):
+        data = self.serializer.dumps(
+            Response(
+                status_code=200,
+                headers=httpx.Headers({"Content-Type": "text/plain"}),
+                stream=httpx.ByteStream(b"foo"),
+                extensions={},
+            ),
+            {},
+            b"foo",
+        )
+
+        first, _vary_fields = self.serializer.loads(data)
+        assert first is not None
+        first.headers["Content-Type"] = "text/html"
+        first.extensions["from_cache"] = True
+
+        second, _vary_fields = self.serializer.loads(data)
+        assert second is not None
+        assert second.headers["Content-Type"] == "text/plain"
+        assert "from_cache" not in second.extensions
+
+    def test_dates_parsed_when_stored(self):
+        data = self.serializer.dumps(
+            Response(
+                status_code=200,
+                headers=httpx.Headers(
+                    {
+                        "Date": "Sun, 06 Nov 1994 08:49:37 GMT",
+                        "Expires": "Sun, 06 Nov 1994 09:49:37 GMT",
+                    }
+                ),
+                stream=httpx.ByteStream(b""),
+                extensions={},
+            ),
+            {},
+            b"",
+        )
+
+        resp, _vary_fields = self.serializer.loads(data)
+        assert resp is not None
+        assert resp.date_epoch == 784111777
+        assert resp.expires_epoch == 784115377
+
+    def test_dumps_memoryview_body(self):
+        data = self.serializer.dumps(
+            Response(
+                status_code=200,
+                headers=httpx.Headers(),
+                stream=httpx.ByteStream(b"foo"),
+                extensions={},
+            ),
+            {},
+            memoryview(b"foo"),
+        )
+
+        resp, _vary_fields = self.serializer.loads(data)
+        assert resp is not None
+        assert next(iter(resp.stream)) == b"foo"
+
+    def test_read_corrupt_v0(self):
+        assert self.serializer.loads(b"cc=0,\xc1") == (None, None)
+
+
+class TestInMemorySerializer(object):
+    def test_dumps_loads(self):
+        serializer = InMemorySerializer()
+        data = serializer.dumps(
+            Response(
+                status_code=200,
+                headers=httpx.Headers(
+                    {"Content-Type": "text/plain", "Transfer-Encoding": "chunked"}
+                ),
+                stream=httpx.ByteStream(b"foo"),
+                extensions={},
+            ),
+            {"accept": "text/plain"},
+            b"foo",
+        )
+
+        first, vary_fields = serializer.loads(data)
+        assert first is not None
+        assert first.status_code == 200
+        assert first.headers["content-type"] == "text/plain"
+        assert "transfer-encoding" not in first.headers
+        assert next(iter(first.stream)) == b"foo"
+        assert vary_fields == {"accept": "text/plain"}
+
+        first.headers["content-type"] = "text/html"
+        first.extensions["from_cache"] = True
+        second, _vary_fields = serializer.loads(data)
+        assert second is not None
+        assert second.headers["content-type"] == "text/plain"
+        assert "from_cache" not in second.extensions
+        assert next(iter(second.stream)) == b"foo"
+
+    def test_loads_miss(self):
+        assert InMemorySerializer().loads(None) == (None, None)
@@ -0,0 +1,91 @@
+import logging
+from typing import List
+
+import httpx
+import mock
+import pytest
+
+from httpx_caching._utils import (
+    ByteStreamWrapper,
+    http_date_to_epoch,
+    sync_callback_generator,
+)
+
+
+class TestByteStreamWrapper(object):
+    def test_callback_receives_full_body(self):
+        bodies: List[bytes] = []
+        stream = ByteStreamWrapper(
+            httpx.ByteStream(b"Hello World"), callback=bodies.append
+        )
+
+        assert b"".join(stream) == b"Hello World"
+        assert bodies == [b"Hello World"]
+
+    def test_callback_is_only_called_once(self):
+        bodies: List[bytes] = []
+        stream = ByteStreamWrapper(httpx.ByteStream(b""), callback=bodies.append)
+
+        list(stream)
+        list(stream)
+        assert bodies == [b""]
+
+    def test_callback_not_called_when_closed_early(self):
+        bodies: List[bytes] = []
+        stream = ByteStreamWrapper(
+            httpx.ByteStream(b"Hello World"), callback=bodies.append
+        )
+
+        stream.close()
+        list(stream)
+        assert bodies == []
+
+    def test_body_over_max_size_is_not_joined(self):
+        bodies: List[bytes] = []
+        chunks = [b"a" * 5, b"b" * 1000, b"c"]
+        stream = ByteStreamWrapper(
+            chunks, callback=bodies.append, max_size=10  # type: ignore
+        )
+
+        with mock.patch.object(ByteStreamWrapper, "_take_body") as take_body:
+            assert list(stream) == chunks
+        assert not take_body.called
+        assert stream.buffer is None
+        assert bodies == []
+
+
+class TestHttpDateToEpoch(object):
+    @pytest.mark.parametrize(
+        "value",
+        [
+            "Sun, 06 Nov 1994 08:49:37 GMT",
+            "Sunday, 06-Nov-94 08:49:37 GMT",
+            "Sun Nov  6 08:49:37 1994",
+            "Sun, 06 Nov 1994 10:49:37 +0200",
+            "Sun, 06 Nov 94 08:49:37 GMT",
+        ],
+    )
+    def test_formats(self, value):
+        assert http_date_to_epoch(value) == 784111777
+
+    @pytest.mark.parametrize(
+        "value", [None, "", "   ", "yesterday", "Sun, 06 Foo 1994 08:49:37 GMT"]
+    )
+    def test_invalid(self, value):
+        assert http_date_to_epoch(value) is None
+
+
+def test_sync_callback_generator_logs_steps(caplog):
+    def double_twice(value):
+        value = yield value
+        value = yield value
+        return value
+
+    with caplog.at_level(logging.DEBUG, logger="httpx_caching._utils"):
+        result = sync_callback_generator(
+            double_twice, lambda value: value * 2, dict(value=1)
+        )
+
+    assert result == 4
+    assert "action: 1" in caplog.messages
+    assert "result: 4" in caplog.messages